@@ -1,20 +1,116 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-from PIL import Image, ImageTk
-import pandas as pd
+import io
 import os
+import csv
 import uuid
+import functools
+import time
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# pandas and PIL are imported on first use: together they add most of the
+# startup time and memory, and neither is needed to show the main window.
+def _pd():
+    import pandas
+    return pandas
+
+def _pil():
+    from PIL import Image, ImageTk
+    return Image, ImageTk
+
 # =========================================================
 # ================ SQLite Persistence =====================
 # =========================================================
 DB_FILE = "app.db"
+READER_POOL_SIZE = 4
+# Stored in PRAGMA user_version; bump it with every schema change (tables,
+# columns, indexes) so init_db() runs again on existing databases
+SCHEMA_VERSION = 4
+# Per-connection cache of compiled statements; helpers reuse module-level SQL
+# strings (SQL_*) so repeated calls hit the cache instead of re-parsing
+STATEMENT_CACHE_SIZE = 512
+# Bound parameters per statement; 999 is the lowest limit any SQLite build uses
+SQLITE_MAX_PARAMS = 999
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+_READERS = queue.Queue()
 
 def db_conn():
-    return sqlite3.connect(DB_FILE)
+    """
+    Return the shared writer connection, opening it on first use.
+    The connection stays open for the whole session (no reconnect per call)
+    and runs in autocommit mode: writes go through writer(), which issues
+    BEGIN IMMEDIATE/COMMIT. WAL lets readers proceed while a write commits.
+    """
+    global _WRITER
+    if _WRITER is None:
+        _WRITER = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None,
+                                  cached_statements=STATEMENT_CACHE_SIZE)
+        _WRITER.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=5000;
+            PRAGMA cache_size=-20000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA foreign_keys=ON;
+        """)
+    return _WRITER
+
+def _fold(text):
+    """SQL fold(): Unicode-aware lowercase (SQLite's lower() only folds ASCII)."""
+    return text.lower() if isinstance(text, str) else text
+
+def open_readers():
+    """Fill the pool with read-only connections (the DB file must exist)."""
+    for _ in range(READER_POOL_SIZE):
+        con = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True,
+                              check_same_thread=False, isolation_level=None,
+                              cached_statements=STATEMENT_CACHE_SIZE)
+        con.executescript("""
+            PRAGMA busy_timeout=5000;
+            PRAGMA cache_size=-20000;
+            PRAGMA temp_store=MEMORY;
+        """)
+        con.create_function("fold", 1, _fold, deterministic=True)
+        _READERS.put(con)
+
+def chunks(seq, size):
+    """Yield consecutive slices of seq with at most size elements."""
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+@contextmanager
+def reader():
+    """Borrow a read-only connection from the pool for the duration of the block."""
+    con = _READERS.get()
+    try:
+        yield con
+    finally:
+        _READERS.put(con)
+
+@contextmanager
+def writer():
+    """
+    Run the block as one BEGIN IMMEDIATE transaction on the writer connection.
+    The lock serializes writers inside the process; IMMEDIATE takes the
+    database write lock up front so the commit cannot fail with SQLITE_BUSY.
+    """
+    with _WRITER_LOCK:
+        con = db_conn()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
 
 def init_db():
     """
@@ -22,10 +118,20 @@ def init_db():
       - users: registered users (sellers/buyers)
       - receipts: transaction headers
       - receipt_items: items purchased per receipt
+      - items: the depot catalog (one row per article)
     This persists across runs and is used for reporting + receipts.
+    Databases older than SCHEMA_VERSION are migrated in the same transaction;
+    a current database skips the DDL entirely.
     """
-    with db_conn() as con:
+    if db_conn().execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with writer() as con:
         cur = con.cursor()
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1 and cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'receipt_items'").fetchone():
+            # v1: receipt_items became a WITHOUT ROWID table keyed by (receipt_id, item_id)
+            cur.execute("ALTER TABLE receipt_items RENAME TO receipt_items_v0")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id TEXT PRIMARY KEY,
@@ -45,123 +151,338 @@ def init_db():
         """)
         cur.execute("""
             CREATE TABLE IF NOT EXISTS receipt_items (
-                receipt_id TEXT,
-                item_id TEXT,
+                receipt_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
                 article TEXT,
                 depot TEXT,
-                price REAL
+                price REAL,
+                line_no INTEGER,        -- position on the receipt, in the order sold
+                PRIMARY KEY (receipt_id, item_id),
+                FOREIGN KEY (receipt_id) REFERENCES receipts(id)
+            ) WITHOUT ROWID
+        """)
+        if version < 1 and cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'receipt_items_v0'").fetchone():
+            cur.execute("""
+                INSERT OR IGNORE INTO receipt_items (receipt_id, item_id, article, depot, price, line_no)
+                SELECT receipt_id, item_id, article, depot, price, rowid FROM receipt_items_v0
+                WHERE item_id IS NOT NULL AND receipt_id IN (SELECT id FROM receipts)
+            """)
+            cur.execute("DROP TABLE receipt_items_v0")
+        if version < 4 and "line_no" not in {
+                row[1] for row in cur.execute("PRAGMA table_info(receipt_items)")}:
+            # v4: lines print in the order they were sold, not in item_id (key) order;
+            # lines saved before this have no number and sort by item_id as before
+            cur.execute("ALTER TABLE receipt_items ADD COLUMN line_no INTEGER")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                ID TEXT PRIMARY KEY,
+                Depot TEXT,
+                Telephone TEXT,
+                Article TEXT,
+                Price REAL,
+                Status TEXT,            -- 'Available' or 'Sold'
+                Image TEXT,
+                UserID TEXT             -- seller who owns the item
             )
         """)
-        con.commit()
+        if version < 2:
+            # v2: case/space-insensitive name lookups through an indexed generated column
+            cur.execute("DROP INDEX IF EXISTS idx_users_name")
+            cur.execute("ALTER TABLE users ADD COLUMN name_norm TEXT "
+                        "GENERATED ALWAYS AS (lower(trim(name))) VIRTUAL")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_users_name_norm ON users(name_norm)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_items_userid ON items(UserID)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_items_status ON items(Status)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_receipts_created ON receipts(created_at)")
+        if version < 3:
+            # v3: per-user receipt history is read newest first; the composite index
+            # serves both the user_id filter and the ORDER BY
+            cur.execute("DROP INDEX IF EXISTS idx_receipts_user")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_receipts_user_created ON receipts(user_id, created_at DESC)")
+        # Refresh planner statistics so the indexes above are picked up
+        cur.execute("ANALYZE")
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 init_db()
+open_readers()
 
 # -------------------- Data setup --------------------
+# Legacy CSV item store, imported once into the items table
 FILE_NAME = "items.csv"
 # Add UserID to link item to its seller/owner user account
 SCHEMA = ["ID", "Depot", "Telephone", "Article", "Price", "Status", "Image", "UserID"]
+STATUS_ALIASES = {"sold": "Sold", "available": "Available"}
+
+def _csv_item_row(rec, seen_ids):
+    """
+    Turn one legacy CSV record into an items row: blanks for missing columns,
+    float Price. A blank ID, or one already in seen_ids, gets a fresh ID so
+    the row is kept rather than dropped.
+    """
+    row = [rec.get(c) or "" for c in SCHEMA]
+    if not row[0] or row[0] in seen_ids:
+        row[0] = uuid.uuid4().hex
+    seen_ids.add(row[0])
+    try:
+        price = float(row[4])
+    except ValueError:
+        price = 0.0
+    row[4] = price if price == price else 0.0   # NaN -> 0.0
+    row[5] = STATUS_ALIASES.get(row[5], row[5])
+    return tuple(row)
 
 def ensure_csv_schema():
-    """Create CSV if missing. If present, add missing columns safely."""
+    """
+    One-time migration of the legacy items.csv into the items table.
+    Records are streamed straight from the file into executemany; missing
+    columns become blanks and Price/Status are normalized here, so rows are
+    stored typed and read_items_cached() needs no coercion.
+    utf-8-sig strips the BOM Excel writes, which would otherwise hide the ID
+    header. Every record is inserted; if any insert fails the transaction
+    rolls back and the CSV stays in place for the next start.
+    The CSV is renamed to items.csv.imported so it is never imported twice.
+    """
     if not os.path.exists(FILE_NAME):
-        df = pd.DataFrame(columns=SCHEMA)
-        df.to_csv(FILE_NAME, index=False)
         return
 
-    df = pd.read_csv(FILE_NAME)
-    changed = False
-
-    for col in SCHEMA:
-        if col not in df.columns:
-            df[col] = ""
-            changed = True
-
-    if changed:
-        df.to_csv(FILE_NAME, index=False)
+    seen_ids = set()
+    with open(FILE_NAME, newline="", encoding="utf-8-sig") as f, writer() as con:
+        con.executemany(
+            "INSERT INTO items (ID, Depot, Telephone, Article, Price, Status, Image, UserID) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (_csv_item_row(rec, seen_ids) for rec in csv.DictReader(f))
+        )
+    os.replace(FILE_NAME, FILE_NAME + ".imported")
 
 ensure_csv_schema()
 
 # -------------------- Utility helpers --------------------
-def read_items():
-    df = pd.read_csv(FILE_NAME)
-    if "Price" in df.columns:
-        df["Price"] = pd.to_numeric(df["Price"], errors="coerce").fillna(0.0)
-    # Normalize Status values
-    if "Status" in df.columns:
-        df["Status"] = df["Status"].fillna("").replace({"sold":"Sold","available":"Available"})
+# Column dtypes for read_items_cached(), declared so pandas does not infer them
+ITEM_DTYPES = {"ID": "string", "Depot": "string", "Telephone": "string", "Article": "string",
+               "Price": "float64", "Status": "category", "Image": "string", "UserID": "category"}
+
+# read_items_cached() result, reused until an item mutation bumps _items_version
+# ("id_pos" maps ID -> row position, "by_user" maps UserID -> row
+# positions and "article_lc" is the lowercased Article column; all three
+# are built on first use)
+_ITEMS_CACHE = {"version": None, "df": None, "id_pos": None, "by_user": None, "article_lc": None}
+_items_version = 0
+
+def items_changed():
+    """Invalidate cached item reads; called after every write to the items table."""
+    global _items_version
+    _items_version += 1
+
+def read_items_cached():
+    """
+    Return the shared cached items frame, reloading it first if an item was
+    written. Callers must not mutate it; take a .copy() of any slice to edit.
+    """
+    if _ITEMS_CACHE["version"] == _items_version:
+        return _ITEMS_CACHE["df"]
+    version = _items_version
+    with reader() as con:
+        df = _pd().read_sql_query(
+            "SELECT ID, Depot, Telephone, Article, Price, Status, Image, UserID FROM items ORDER BY rowid",
+            con, dtype=ITEM_DTYPES
+        )
+    _ITEMS_CACHE["version"] = version
+    _ITEMS_CACHE["df"] = df
+    _ITEMS_CACHE["id_pos"] = None
+    _ITEMS_CACHE["by_user"] = None
+    _ITEMS_CACHE["article_lc"] = None
     return df
 
-def write_items(df):
-    df.to_csv(FILE_NAME, index=False)
+def items_by_id(ids):
+    """
+    Cached item rows for ids, in that order; repeated IDs are taken once and
+    IDs no longer in the table are skipped. O(len(ids)) dict lookups.
+    """
+    df = read_items_cached()
+    id_pos = _ITEMS_CACHE["id_pos"]
+    if id_pos is None:
+        id_pos = _ITEMS_CACHE["id_pos"] = {item_id: i for i, item_id in enumerate(df["ID"].tolist())}
+    return df.iloc[[id_pos[i] for i in dict.fromkeys(ids) if i in id_pos]]
+
+def items_of_user(uid, query=""):
+    """
+    Cached item rows whose UserID is uid, optionally only those whose Article
+    contains query (already lowercased, matched literally, not as a regex).
+    """
+    df = read_items_cached()
+    if _ITEMS_CACHE["by_user"] is None:
+        _ITEMS_CACHE["by_user"] = df.groupby("UserID", observed=True, sort=False).indices
+        _ITEMS_CACHE["article_lc"] = df["Article"].fillna("").str.lower()
+    pos = _ITEMS_CACHE["by_user"].get(uid)
+    if pos is None:
+        return df.iloc[:0]
+    if query:
+        lc = _ITEMS_CACHE["article_lc"].iloc[pos]
+        pos = pos[lc.str.contains(query, regex=False).to_numpy(dtype=bool)]
+    return df.iloc[pos]
+
+def search_items(query="", status=None, columns=SCHEMA):
+    """
+    Items whose Depot or Article contains query (already lowercased, matched
+    literally), optionally restricted to one Status. The filter runs in SQL,
+    so only matching rows are loaded; Status=? uses idx_items_status.
+    Returns plain tuples of the given columns straight off the cursor, in
+    insertion order (no DataFrame on the dashboard refresh path).
+    """
+    where, params = [], []
+    if status:
+        where.append("Status = ?")
+        params.append(status)
+    if query:
+        where.append("(instr(fold(Depot), ?) > 0 OR instr(fold(Article), ?) > 0)")
+        params += [query, query]
+    sql = f"SELECT {', '.join(columns)} FROM items"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with reader() as con:
+        return con.execute(sql + " ORDER BY rowid", params).fetchall()
+
+SQL_INSERT_ITEM = "INSERT INTO items (ID, Depot, Telephone, Article, Price, Status, Image, UserID) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+def insert_item(row):
+    """Insert one item; row is a dict keyed by SCHEMA. Nothing else is re-read or rewritten."""
+    with writer() as con:
+        con.execute(SQL_INSERT_ITEM, tuple(row[c] for c in SCHEMA))
+    items_changed()
+
+def update_item(item_id, fields):
+    """Update the given columns of one item; fields is a dict keyed by SCHEMA."""
+    cols = [c for c in SCHEMA if c in fields and c != "ID"]
+    if not cols:
+        return
+    with writer() as con:
+        con.execute(
+            f"UPDATE items SET {', '.join(f'{c} = ?' for c in cols)} WHERE ID = ?",
+            [fields[c] for c in cols] + [item_id]
+        )
+    items_changed()
+
+def delete_items(ids):
+    """Delete items by ID with one IN (...) statement per SQLITE_MAX_PARAMS IDs, in one transaction."""
+    ids = list(ids)
+    with writer() as con:
+        for chunk in chunks(ids, SQLITE_MAX_PARAMS):
+            con.execute(f"DELETE FROM items WHERE ID IN ({', '.join('?' * len(chunk))})", chunk)
+    items_changed()
+
+def mark_items_sold(ids):
+    """Set Status='Sold' with one UPDATE ... IN (...) per SQLITE_MAX_PARAMS IDs, in one transaction."""
+    ids = list(ids)
+    with writer() as con:
+        for chunk in chunks(ids, SQLITE_MAX_PARAMS):
+            con.execute(f"UPDATE items SET Status = 'Sold' WHERE ID IN ({', '.join('?' * len(chunk))})", chunk)
+    items_changed()
 
 def generate_id():
-    return str(uuid.uuid4())
+    return uuid.uuid4().hex
+
+# Last formatted timestamp: [epoch second, ISO string]
+_LAST_TS = [0, ""]
 
 def now_iso():
-    return datetime.utcnow().isoformat(timespec="seconds")
+    """UTC timestamp at second resolution, formatted at most once per second."""
+    t = int(time.time())
+    if t != _LAST_TS[0]:
+        _LAST_TS[0] = t
+        _LAST_TS[1] = datetime.utcfromtimestamp(t).isoformat(timespec="seconds")
+    return _LAST_TS[1]
 
 # =========================================================
 # ================ User Management ========================
 # =========================================================
+SQL_INSERT_USER = "INSERT INTO users (id, name, phone, created_at) VALUES (?, ?, ?, ?)"
+SQL_GET_USER = "SELECT id, name, phone, created_at FROM users WHERE id = ?"
+SQL_USER_NAMES = "SELECT id, name_norm FROM users ORDER BY rowid"
+
+# ID set and normalized-name -> [IDs] map behind validate_user_id and
+# suggest_user_id, rebuilt after create_user bumps _users_version
+_USERS_CACHE = {"version": None, "ids": None, "by_name": None}
+_users_version = 0
+
+# SQLite's lower()/trim() only fold ASCII letters and strip spaces; mirror that exactly
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def normalize_name(name):
+    """Python twin of the users.name_norm expression lower(trim(name))."""
+    return name.strip(" ").translate(_ASCII_LOWER)
+
 def create_user(name, phone):
     """
-    Create a new user with a generated UUID. Persist to SQLite.
+    Create a new user with a generated UUID (32 hex chars). Persist to SQLite.
+    Returns the new row as (id, name, phone, created_at).
     """
-    uid = generate_id()
-    with db_conn() as con:
-        con.execute(
-            "INSERT INTO users (id, name, phone, created_at) VALUES (?, ?, ?, ?)",
-            (uid, name.strip(), phone.strip(), now_iso())
-        )
-        con.commit()
-    return uid
+    row = (generate_id(), name.strip(), phone.strip(), now_iso())
+    global _users_version
+    with writer() as con:
+        con.execute(SQL_INSERT_USER, row)
+    _users_version += 1
+    if _USERS_CACHE["version"] == _users_version - 1:
+        # The index was current before this insert: add the user instead of reloading
+        _USERS_CACHE["ids"].add(row[0])
+        _USERS_CACHE["by_name"].setdefault(normalize_name(row[1]), []).append(row[0])
+        _USERS_CACHE["version"] = _users_version
+    return row
+
+def _users_index():
+    """Return the cached user lookup tables, reloading them once per users change."""
+    if _USERS_CACHE["version"] != _users_version:
+        version = _users_version
+        ids, by_name = set(), {}
+        with reader() as con:
+            for uid, key in con.execute(SQL_USER_NAMES):
+                ids.add(uid)
+                by_name.setdefault(key, []).append(uid)
+        _USERS_CACHE.update(version=version, ids=ids, by_name=by_name)
+    return _USERS_CACHE
 
 def get_user(user_id):
     if not user_id:
         return None
-    with db_conn() as con:
-        cur = con.cursor()
-        cur.execute("SELECT id, name, phone, created_at FROM users WHERE id = ?", (user_id.strip(),))
-        row = cur.fetchone()
-        if row:
-            return {"id": row[0], "name": row[1], "phone": row[2], "created_at": row[3]}
+    with reader() as con:
+        row = con.execute(SQL_GET_USER, (user_id.strip(),)).fetchone()
+    if row:
+        return {"id": row[0], "name": row[1], "phone": row[2], "created_at": row[3]}
     return None
 
 def suggest_user_id(name):
-    """Suggest user ID based on name if exists"""
+    """Suggest user IDs whose name matches, ignoring case and surrounding spaces"""
     if not name:
         return None
-    with db_conn() as con:
-        cur = con.cursor()
-        cur.execute("SELECT id FROM users WHERE name = ?", (name.strip(),))
-        rows = cur.fetchall()
-        return [row[0] for row in rows] if rows else None
+    ids = _users_index()["by_name"].get(normalize_name(name.strip()))
+    return list(ids) if ids else None
 
 def validate_user_id(user_id):
     """Check if user ID exists in database"""
-    return bool(get_user(user_id)) if user_id else False
+    if not user_id:
+        return False
+    return user_id.strip() in _users_index()["ids"]
 
-def get_user_dialog(parent, title="Enter Your User ID"):
-    """
-    Simple dialog that only accepts existing user IDs
-    """
-    dlg = tk.Toplevel(parent)
-    dlg.title(title)
+# Login dialog, built on first use and then hidden/re-shown instead of rebuilt
+_login_dlg = None
+
+def _build_login_dialog():
+    dlg = tk.Toplevel(window)
     dlg.geometry("420x180")
     dlg.configure(bg="#EAF6FF")
     dlg.resizable(False, False)
-    dlg.transient(parent)
-    dlg.grab_set()
 
     tk.Label(dlg, text="User Login", font=("Arial", 14, "bold"), bg="#EAF6FF").pack(pady=(14, 4))
     
     tk.Label(dlg, text="Enter your User ID:", bg="#EAF6FF", font=("Arial", 11)).pack()
-    user_id_var = tk.StringVar()
-    e_id = tk.Entry(dlg, textvariable=user_id_var, font=("Arial", 12), width=36)
-    e_id.pack(pady=4)
+    dlg.user_id_var = tk.StringVar()
+    dlg.e_id = tk.Entry(dlg, textvariable=dlg.user_id_var, font=("Arial", 12), width=36)
+    dlg.e_id.pack(pady=4)
+    # Written when the dialog is answered; get_user_dialog waits on it
+    dlg.done = tk.BooleanVar(dlg, False)
 
     def submit():
-        uid = user_id_var.get().strip()
+        uid = dlg.user_id_var.get().strip()
         if not uid:
             messagebox.showerror("Error", "User ID is required", parent=dlg)
             return
@@ -171,54 +492,278 @@ def get_user_dialog(parent, title="Enter Your User ID"):
             return
             
         dlg.result = uid
-        dlg.destroy()
+        dlg.done.set(True)
+
+    def cancel():
+        dlg.result = None
+        dlg.done.set(True)
 
     tk.Button(dlg, text="Login", bg="#1E90FF", fg="white", width=16, command=submit).pack(pady=(6, 10))
-    tk.Button(dlg, text="Cancel", bg="#A9A9A9", fg="white", width=12, command=dlg.destroy).pack(pady=4)
+    tk.Button(dlg, text="Cancel", bg="#A9A9A9", fg="white", width=12, command=cancel).pack(pady=4)
+    dlg.protocol("WM_DELETE_WINDOW", cancel)
+    dlg.withdraw()
+    return dlg
 
-    e_id.focus_set()
-    parent.wait_window(dlg)
-    return getattr(dlg, "result", None)
+def get_user_dialog(parent, title="Enter Your User ID"):
+    """
+    Simple dialog that only accepts existing user IDs
+    """
+    global _login_dlg
+    if _login_dlg is None or not _login_dlg.winfo_exists():
+        _login_dlg = _build_login_dialog()
+    dlg = _login_dlg
+    dlg.title(title)
+    dlg.transient(parent)
+    dlg.result = None
+    dlg.user_id_var.set("")
+    dlg.deiconify()
+    dlg.grab_set()
+    dlg.e_id.focus_set()
+
+    dlg.wait_variable(dlg.done)
+    dlg.grab_release()
+    dlg.withdraw()
+    return dlg.result
 
 # =========================================================
 # ============ Receipts + Sales History ===================
 # =========================================================
-def create_receipt(user_id, role, items_rows):
+SQL_INSERT_RECEIPT = "INSERT INTO receipts (id, user_id, role, total, created_at) VALUES (?, ?, ?, ?, ?)"
+# Followed by one "(?, ?, ?, ?, ?, ?)" group per line (see save_receipt)
+SQL_INSERT_RECEIPT_ITEMS = "INSERT INTO receipt_items (receipt_id, item_id, article, depot, price, line_no) VALUES "
+
+def save_receipt(receipt_row, item_rows):
+    """
+    Write a receipt header and all of its lines in a single transaction.
+    receipt_row: (id, user_id, role, total, created_at)
+    item_rows: list of (receipt_id, item_id, article, depot, price) tuples,
+    numbered into line_no in the order given
+    Lines go in as multi-row INSERTs, as many rows per statement as the
+    parameter limit allows, so a receipt costs a couple of statements.
+    """
+    numbered = [row + (line_no,) for line_no, row in enumerate(item_rows)]
+    with writer() as con:
+        con.execute(SQL_INSERT_RECEIPT, receipt_row)
+        for chunk in chunks(numbered, SQLITE_MAX_PARAMS // 6):
+            con.execute(SQL_INSERT_RECEIPT_ITEMS + ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(chunk)),
+                        [v for row in chunk for v in row])
+
+def receipt_lines(ids):
+    """items_rows for create_receipt and their total, looked up in one selection of the cached items."""
+    sub = items_by_id(ids)[["ID", "Article", "Depot", "Price"]].rename(
+        columns={"ID": "item_id", "Article": "article", "Depot": "depot", "Price": "price"})
+    # Price is float64 already, so to_dict hands back plain floats
+    return sub.to_dict("records"), float(sub["price"].sum())
+
+def create_receipt(user_id, role, items_rows, precomputed_total=None):
     """
     Persist a receipt and its items.
     items_rows: list of dicts with keys {item_id, article, depot, price}
+    precomputed_total: sum of the prices, when the caller already has it
     Returns receipt_id and total.
     """
     rid = generate_id()
-    total = sum(float(x["price"]) for x in items_rows) if items_rows else 0.0
-    with db_conn() as con:
-        con.execute("INSERT INTO receipts (id, user_id, role, total, created_at) VALUES (?, ?, ?, ?, ?)",
-                    (rid, user_id, role, total, now_iso()))
-        con.executemany(
-            "INSERT INTO receipt_items (receipt_id, item_id, article, depot, price) VALUES (?, ?, ?, ?, ?)",
-            [(rid, it["item_id"], it["article"], it["depot"], float(it["price"])) for it in items_rows]
-        )
-        con.commit()
+    if precomputed_total is not None:
+        total = precomputed_total
+    else:
+        total = sum(float(x["price"]) for x in items_rows) if items_rows else 0.0
+    save_receipt(
+        (rid, user_id, role, total, now_iso()),
+        [(rid, it["item_id"], it["article"], it["depot"], float(it["price"])) for it in items_rows]
+    )
     return rid, total
 
+# One row per item (a single row of NULL items for an empty receipt)
+SQL_RECEIPT_WITH_ITEMS = """
+SELECT r.id, r.user_id, r.role, r.total, r.created_at,
+       ri.item_id, ri.article, ri.depot, ri.price
+FROM receipts r LEFT JOIN receipt_items ri ON ri.receipt_id = r.id
+WHERE r.id = ?
+ORDER BY ri.line_no, ri.item_id
+"""
+
+# Same rows for every receipt of one user, newest receipt first
+SQL_USER_RECEIPTS_WITH_ITEMS = """
+SELECT r.id, r.user_id, r.role, r.total, r.created_at,
+       ri.item_id, ri.article, ri.depot, ri.price
+FROM receipts r LEFT JOIN receipt_items ri ON ri.receipt_id = r.id
+WHERE r.user_id = ?
+ORDER BY r.created_at DESC, r.id, ri.line_no, ri.item_id
+"""
+
+@functools.lru_cache(maxsize=512)
 def render_receipt_text(receipt_id):
-    with db_conn() as con:
-        cur = con.cursor()
-        cur.execute("SELECT id, user_id, role, total, created_at FROM receipts WHERE id = ?", (receipt_id,))
-        rec = cur.fetchone()
-        cur.execute("SELECT item_id, article, depot, price FROM receipt_items WHERE receipt_id = ?", (receipt_id,))
-        items = cur.fetchall()
+    """Receipt text for receipt_id; cached, since a saved receipt never changes."""
+    with reader() as con:
+        rows = con.execute(SQL_RECEIPT_WITH_ITEMS, (receipt_id,)).fetchall()
 
-    if not rec:
+    if not rows:
         return "Receipt not found."
-    rid, uid, role, total, created = rec
+    return _format_receipt(rows)
+
+def render_user_receipts(user_id):
+    """Texts of every receipt recorded for user_id, newest first, from one query."""
+    with reader() as con:
+        rows = con.execute(SQL_USER_RECEIPTS_WITH_ITEMS, (user_id,)).fetchall()
+    by_receipt = {}
+    for row in rows:
+        by_receipt.setdefault(row[0], []).append(row)
+    return [_format_receipt(r) for r in by_receipt.values()]
+
+def receipt_history_text(user_id):
+    """render_user_receipts joined into one block, each receipt followed by a rule ("" if none)."""
+    return "".join(text + "\n" + "-"*40 + "\n" for text in render_user_receipts(user_id))
+
+def _format_receipt(rows):
+    """Receipt text from its SQL_RECEIPT_WITH_ITEMS rows."""
+    rid, uid, role, total, created = rows[0][:5]
     header = f"Receipt ID: {rid}\nUser ID: {uid or 'N/A'}\nRole: {role}\nDate: {created}\n\nItems:\n"
-    body = ""
-    for (item_id, article, depot, price) in items:
-        body += f"- {article} (from {depot})  [{item_id}]  -  ${float(price):.2f}\n"
+    body = "".join(
+        f"- {article} (from {depot})  [{item_id}]  -  ${float(price):.2f}\n"
+        for (*_, item_id, article, depot, price) in rows
+        if item_id is not None
+    )
     footer = f"\nTotal: ${float(total):.2f}\n"
     return header + body + footer
 
+# -------------------- Tk helpers --------------------
+def debounce(widget, delay_ms, func):
+    """Return a callback that runs func once, delay_ms after the last call (e.g. last keystroke)."""
+    pending = [None]
+
+    def run():
+        pending[0] = None
+        func()
+
+    def trigger(*_):
+        if pending[0] is not None:
+            widget.after_cancel(pending[0])
+        pending[0] = widget.after(delay_ms, run)
+    return trigger
+
+@contextmanager
+def scroll_detached(tree):
+    """
+    Unhook the tree's scrollbars for a bulk insert/delete and update them
+    once at the end, instead of once per row (Tk's BeginUpdate/EndUpdate).
+    """
+    ycmd, xcmd = str(tree.cget("yscrollcommand")), str(tree.cget("xscrollcommand"))
+    tree.configure(yscrollcommand="", xscrollcommand="")
+    try:
+        yield
+    finally:
+        tree.configure(yscrollcommand=ycmd, xscrollcommand=xcmd)
+        if ycmd:
+            tree.tk.call(*tree.tk.splitlist(ycmd), *tree.yview())
+        if xcmd:
+            tree.tk.call(*tree.tk.splitlist(xcmd), *tree.xview())
+
+# Slow non-Tk work behind report windows (DB reads, text formatting) runs here
+_WORK_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="work")
+
+def run_in_background(widget, func, on_done, *args):
+    """
+    Run func(*args) on _WORK_POOL, then on_done(result) on the Tk thread.
+    Like show_thumbnail, the Tk side polls the future with after() since Tk
+    must not be called from the worker; on_done is dropped if widget is gone.
+    """
+    future = _WORK_POOL.submit(func, *args)
+
+    def poll():
+        if not widget.winfo_exists():
+            return
+        if not future.done():
+            widget.after(15, poll)
+            return
+        on_done(future.result())
+    poll()
+
+def set_text(txt, text):
+    """Replace the whole content of a read-only (state="disabled") Text widget."""
+    txt.config(state="normal")
+    txt.delete("1.0", "end")
+    txt.insert("1.0", text)
+    txt.config(state="disabled")
+
+def sync_tree(tree, rows):
+    """
+    Make a Treeview show rows ([(iid, values), ...] in display order) by
+    deleting, inserting or updating only the rows that differ. The values
+    last shown are kept on tree.shown, so unchanged rows cost no Tk call.
+    """
+    shown = getattr(tree, "shown", {})
+    new = dict(rows)
+    gone = [iid for iid in shown if iid not in new]
+    if gone or len(new) > len(shown):
+        # Rows are added or removed: keep the scrollbars still until the end
+        with scroll_detached(tree):
+            _apply_rows(tree, rows, shown, gone)
+    else:
+        _apply_rows(tree, rows, shown, gone)
+    tree.shown = new
+
+def _apply_rows(tree, rows, shown, gone):
+    if gone:
+        tree.delete(*gone)
+    for index, (iid, values) in enumerate(rows):
+        old = shown.get(iid)
+        if old is None:
+            tree.insert("", index, iid=iid, values=values)
+        elif old != values:
+            tree.item(iid, values=values)
+
+THUMB_SIZE = (300, 300)
+# Image decoding/resizing happens here, off the Tk thread
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbs")
+
+@functools.lru_cache(maxsize=128)
+def _thumbnail_png(path, mtime, size):
+    """PNG bytes of the image at path shrunk to fit size (mtime only keys the cache)."""
+    Image, _ = _pil()
+    with Image.open(path) as img:
+        img.thumbnail(size, Image.Resampling.BILINEAR)
+        if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def show_thumbnail(label, img_path):
+    """
+    Show img_path scaled to THUMB_SIZE in label, or "No photo available".
+    The decode runs on _IMAGE_POOL and is cached per (path, mtime); the label
+    polls for the result on the Tk thread (Tk must not be called from the
+    worker), and only the most recently requested image is painted.
+    Asking again for the image already shown (same path and mtime), as every
+    dashboard refresh does, is a no-op.
+    """
+    key = (img_path, os.path.getmtime(img_path)) if img_path and os.path.exists(img_path) else None
+    if hasattr(label, "thumb_path") and getattr(label, "thumb_key", None) == key:
+        return
+    label.thumb_path = img_path
+    label.thumb_key = key
+    if key is None:
+        label.config(image="", text="No photo available")
+        label.image = None
+        return
+    future = _IMAGE_POOL.submit(_thumbnail_png, img_path, key[1], THUMB_SIZE)
+
+    def paint():
+        if not label.winfo_exists() or label.thumb_path != img_path:
+            return
+        if not future.done():
+            label.after(15, paint)
+            return
+        try:
+            img_tk = tk.PhotoImage(master=label, data=future.result())
+        except Exception:
+            label.config(image="", text="No photo available")
+            label.image = None
+            return
+        label.image = img_tk
+        label.config(image=img_tk, text="")
+    paint()
+
 # -------------------- Owner UI --------------------
 def owner_function():
     pw = tk.Toplevel(window)
@@ -263,7 +808,8 @@ def open_owner_dashboard():
     table_frame = tk.Frame(owner_win, bg="#FFFFFF", bd=2, relief="sunken")
     table_frame.pack(padx=20, pady=10, fill="both", expand=True)
 
-    columns = ("ID", "Depot", "Telephone", "Article", "Price", "Status", "UserID")
+    # Image is a hidden column so the preview can read the path from the row
+    columns = ("ID", "Depot", "Telephone", "Article", "Price", "Status", "UserID", "Image")
     tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode="extended")
     vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
     hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
@@ -281,6 +827,7 @@ def open_owner_dashboard():
     tree.column("Price", width=120, anchor="e")
     tree.column("Status", width=120)
     tree.column("UserID", width=280)
+    tree.column("Image", width=0, stretch=False)
 
     img_frame = tk.Frame(owner_win, bg="#F5F5DC", bd=2, relief="sunken")
     img_frame.pack(side="right", padx=20, pady=10, fill="both", expand=False)
@@ -288,27 +835,24 @@ def open_owner_dashboard():
     img_label.pack(fill="both", expand=True)
 
     refresh_paused = {"value": False}
+    # _items_version the table was last filled from; the poll below only
+    # refreshes when an item write has bumped it since
+    shown_version = {"value": None}
+
+    def refresh_items():
+        # Rows keep the item ID as iid, so the selection survives a refresh
+        shown_version["value"] = _items_version
+        rows = search_items(filter_var.get().strip().lower(), columns=columns)
+        # Price (column 4) shown with two decimals
+        sync_tree(tree, [(r[0], r[:4] + (f"{r[4]:.2f}",) + r[5:]) for r in rows])
+        update_image_preview()
 
     def load_items():
-        if refresh_paused["value"]:
-            owner_win.after(2000, load_items)
-            return
-        selected_ids = [tree.item(s)["values"][0] for s in tree.selection()]
-        query = filter_var.get().strip().lower()
-        tree.delete(*tree.get_children())
-        df = read_items()
-        if query:
-            df = df[
-                df["Depot"].astype(str).str.lower().str.contains(query) |
-                df["Article"].astype(str).str.lower().str.contains(query)
-            ]
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(r["ID"], r["Depot"], r["Telephone"], r["Article"], f"{float(r['Price']):.2f}", r["Status"], r.get("UserID","")))
-        for i in tree.get_children():
-            if tree.item(i)["values"][0] in selected_ids:
-                tree.selection_add(i)
-        update_image_preview()
-        owner_win.after(2000, load_items)
+        if not refresh_paused["value"] and shown_version["value"] != _items_version:
+            refresh_items()
+        owner_win.after(500, load_items)
+
+    filter_var.trace_add("write", debounce(owner_win, 250, refresh_items))
 
     def with_pause(func):
         def wrapper(*args, **kwargs):
@@ -411,7 +955,6 @@ def open_owner_dashboard():
             except ValueError:
                 messagebox.showerror("Error", "Price must be a number", parent=win)
                 return
-            df = read_items()
             new_row = {
                 "ID": generate_id(),
                 "Depot": e_depot.get().strip(),
@@ -422,39 +965,34 @@ def open_owner_dashboard():
                 "Image": img_path_var.get(),
                 "UserID": user_id_val
             }
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            write_items(df)
+            insert_item(new_row)
             win.destroy()
 
         tk.Button(win, text="Save", font=("Arial", 12), bg="#FF69B4", fg="white", width=14, command=save).pack(pady=14)
 
     def update_image_preview(event=None):
         sel = tree.selection()
-        if sel:
-            item_id = tree.item(sel[0])["values"][0]
-            df = read_items()
-            img_path = str(df.loc[df["ID"] == item_id, "Image"].values[0]) if len(df.loc[df["ID"] == item_id, "Image"]) else ""
-            if img_path and str(img_path).lower() != "nan" and os.path.exists(img_path):
-                img = Image.open(img_path)
-                img = img.resize((300, 300), Image.LANCZOS)
-                img_tk = ImageTk.PhotoImage(img)
-                img_label.image = img_tk
-                img_label.config(image=img_tk, text="")
-                def open_fullscreen(e=None):
-                    fs_win = tk.Toplevel(owner_win)
-                    fs_win.title("Image Fullscreen")
-                    fs_win.configure(bg="black")
-                    fs_img = ImageTk.PhotoImage(Image.open(img_path))
-                    lbl = tk.Label(fs_win, image=fs_img, bg="black")
-                    lbl.image = fs_img
-                    lbl.pack(expand=True, fill="both")
-                    fs_win.bind("<Escape>", lambda e: fs_win.destroy())
-                    tk.Button(fs_win, text="Close", command=fs_win.destroy, bg="#A9A9A9", fg="white").pack(side="bottom", pady=8)
-                img_label.bind("<Button-1>", open_fullscreen)
-            else:
-                img_label.config(image="", text="No photo available")
+        img_path = tree.set(sel[0], "Image") if sel else ""
+        show_thumbnail(img_label, img_path)
+        # Only offer fullscreen when show_thumbnail found the file; this also
+        # drops the binding left from the previously selected item
+        if img_label.thumb_key is None:
+            img_label.unbind("<Button-1>")
         else:
-            img_label.config(image="", text="No photo available")
+            def open_fullscreen(e=None):
+                Image, ImageTk = _pil()
+                fs_win = tk.Toplevel(owner_win)
+                fs_win.title("Image Fullscreen")
+                fs_win.configure(bg="black")
+                fs_img = ImageTk.PhotoImage(Image.open(img_path))
+                lbl = tk.Label(fs_win, image=fs_img, bg="black")
+                lbl.image = fs_img
+                lbl.pack(expand=True, fill="both")
+                fs_win.bind("<Escape>", lambda e: fs_win.destroy())
+                tk.Button(fs_win, text="Close", command=fs_win.destroy, bg="#A9A9A9", fg="white").pack(side="bottom", pady=8)
+            img_label.bind("<Button-1>", open_fullscreen)
+
+    tree.bind("<<TreeviewSelect>>", update_image_preview)
 
     @with_pause
     def modify_selected():
@@ -466,9 +1004,7 @@ def open_owner_dashboard():
             messagebox.showerror("Error", "Select only one item to modify", parent=owner_win)
             return
         item = tree.item(sel[0])["values"]
-        item_id, depot, tel, article, price, status, user_id_val = item
-        df = read_items()
-        img_path = df.loc[df["ID"] == item_id, "Image"].values[0]
+        item_id, depot, tel, article, price, status, user_id_val, img_path = item
 
         win = tk.Toplevel(owner_win)
         win.title("Modify Item")
@@ -565,18 +1101,15 @@ def open_owner_dashboard():
             if new_status not in ("Available", "Sold"):
                 messagebox.showerror("Error", "Status must be 'Available' or 'Sold'", parent=win)
                 return
-            df = read_items()
-            idx = df.index[df["ID"] == item_id]
-            if len(idx):
-                ix = idx[0]
-                df.loc[ix, "UserID"] = user_id_val
-                df.loc[ix, "Depot"] = e_depot.get().strip()
-                df.loc[ix, "Telephone"] = e_tel.get().strip()
-                df.loc[ix, "Article"] = e_article.get().strip()
-                df.loc[ix, "Price"] = new_price
-                df.loc[ix, "Status"] = new_status
-                df.loc[ix, "Image"] = img_path_var.get()
-                write_items(df)
+            update_item(item_id, {
+                "UserID": user_id_val,
+                "Depot": e_depot.get().strip(),
+                "Telephone": e_tel.get().strip(),
+                "Article": e_article.get().strip(),
+                "Price": new_price,
+                "Status": new_status,
+                "Image": img_path_var.get()
+            })
             win.destroy()
 
         tk.Button(win, text="Save Changes", font=("Arial", 12),
@@ -589,10 +1122,8 @@ def open_owner_dashboard():
             return
         if not messagebox.askyesno("Confirm", "Delete selected item(s)? This does not affect receipts history.", parent=owner_win):
             return
-        ids = [tree.item(s)["values"][0] for s in sel]
-        df = read_items()
-        df = df[~df["ID"].isin(ids)]
-        write_items(df)
+        # Rows use the item ID as iid
+        delete_items(sel)
 
     def mark_sold():
         sel = tree.selection()
@@ -604,21 +1135,13 @@ def open_owner_dashboard():
         if buyer_id is None:
             return
 
-        df = read_items()
-        ids = [tree.item(s)["values"][0] for s in sel]
-        items_rows = []
-        for s in sel:
-            vals = tree.item(s)["values"]
-            items_rows.append({
-                "item_id": vals[0],
-                "depot": vals[1],
-                "article": vals[3],
-                "price": float(vals[4])
-            })
+        # Rows use the item ID as iid
+        ids = list(sel)
+        items_rows, total = receipt_lines(ids)
         # Create receipt for buyer; owner executed action (role='owner')
-        receipt_id, total = create_receipt(buyer_id, role="owner", items_rows=items_rows)
-        df.loc[df["ID"].isin(ids), "Status"] = "Sold"
-        write_items(df)
+        receipt_id, total = create_receipt(buyer_id, role="owner", items_rows=items_rows,
+                                           precomputed_total=total)
+        mark_items_sold(ids)
         # Show receipt
         rec_txt = render_receipt_text(receipt_id)
         messagebox.showinfo("Items Sold", f"Receipt created.\n\n{rec_txt}", parent=owner_win)
@@ -628,15 +1151,16 @@ def open_owner_dashboard():
         if not sel:
             messagebox.showerror("Error", "Select item(s) to calculate", parent=owner_win)
             return
-        prices = [float(tree.item(s)["values"][4]) for s in sel]
-        total = sum(prices)
+        # Rows use the item ID as iid
+        sub = items_by_id(sel)
+        prices = sub["Price"].to_numpy(dtype="float64")
+        total = float(prices.sum())
         depot_share = total * 0.25
         final_total = total - depot_share
 
-        receipt_text = "Receipt (Depot Gain 25%)\n\n"
-        for s in sel:
-            item = tree.item(s)["values"]
-            receipt_text += f"{item[3]} (from {item[1]})  -  ${float(item[4]):.2f}\n"
+        receipt_text = "Receipt (Depot Gain 25%)\n\n" + "".join(
+            f"{a} (from {d})  -  ${p:.2f}\n" for a, d, p in zip(sub["Article"], sub["Depot"], prices)
+        )
         receipt_text += f"\nOriginal Total: ${total:.2f}"
         receipt_text += f"\nDepot Share (25%): ${depot_share:.2f}"
         receipt_text += f"\nNet Total: ${final_total:.2f}"
@@ -658,8 +1182,7 @@ def open_owner_dashboard():
         if not sel:
             messagebox.showerror("Error", "Select item(s) to calculate 25% of", parent=owner_win)
             return
-        prices = [float(tree.item(s)["values"][4]) for s in sel]
-        total = sum(prices)
+        total = float(items_by_id(sel)["Price"].sum())
         gained = total * 0.25
         messagebox.showinfo("25% Calculation", f"Total of selected items: ${total:.2f}\n25% Gain: ${gained:.2f}", parent=owner_win)
         
@@ -691,11 +1214,10 @@ def open_owner_dashboard():
 
         def load_users():
             tree.delete(*tree.get_children())
-            with db_conn() as con:
-                cur = con.cursor()
-                cur.execute("SELECT id, name, phone, created_at FROM users")
-                for row in cur.fetchall():
-                    tree.insert("", "end", values=row)
+            with reader() as con:
+                rows = con.execute("SELECT id, name, phone, created_at FROM users").fetchall()
+            for row in rows:
+                tree.insert("", "end", iid=row[0], values=row)
         
         load_users()
 
@@ -718,9 +1240,9 @@ def open_owner_dashboard():
                 messagebox.showerror("Error", "Name is required", parent=users_win)
                 return
                 
-            uid = create_user(name, phone)
-            messagebox.showinfo("Success", f"User created with ID:\n\n{uid}", parent=users_win)
-            load_users()
+            row = create_user(name, phone)
+            tree.insert("", "end", iid=row[0], values=row)
+            messagebox.showinfo("Success", f"User created with ID:\n\n{row[0]}", parent=users_win)
         
         tk.Button(add_frame, text="Add User", bg="#32CD32", fg="white", 
                   command=add_user).grid(row=0, column=4, padx=10)
@@ -772,7 +1294,8 @@ def buyer_function():
     table_frame = tk.Frame(buyer_win, bg="#FFFFFF", bd=2, relief="sunken")
     table_frame.pack(padx=20, pady=10, fill="both", expand=True)
 
-    columns = ("ID", "Depot", "Telephone", "Article", "Price", "Status")
+    # Image is a hidden column so the preview can read the path from the row
+    columns = ("ID", "Depot", "Telephone", "Article", "Price", "Status", "Image")
     tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode="extended")
     vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
     hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
@@ -789,6 +1312,7 @@ def buyer_function():
     tree.column("Article", width=280)
     tree.column("Price", width=120, anchor="e")
     tree.column("Status", width=120)
+    tree.column("Image", width=0, stretch=False)
 
     # Image preview frame
     img_frame = tk.Frame(buyer_win, bg="#FFC0CB", bd=2, relief="sunken")
@@ -797,29 +1321,25 @@ def buyer_function():
     img_label.pack(fill="both", expand=True)
 
     refresh_paused = {"value": False}
+    # _items_version the table was last filled from; the poll below only
+    # refreshes when an item write has bumped it since
+    shown_version = {"value": None}
+
+    def refresh_buyer_items():
+        # Rows keep the item ID as iid, so the selection survives a refresh
+        shown_version["value"] = _items_version
+        # Only show available items
+        rows = search_items(search_var.get().strip().lower(), status="Available", columns=columns)
+        # Price (column 4) shown with two decimals
+        sync_tree(tree, [(r[0], r[:4] + (f"{r[4]:.2f}",) + r[5:]) for r in rows])
+        update_image_preview()
 
     def load_buyer_items():
-        if refresh_paused["value"]:
-            buyer_win.after(2000, load_buyer_items)
-            return
-        selected_ids = [tree.item(s)["values"][0] for s in tree.selection()]
-        query = search_var.get().strip().lower()
-        tree.delete(*tree.get_children())
-        df = read_items()
-        df = df[df["Status"] == "Available"]  # Only show available items
-        if query:
-            df = df[
-                df["Depot"].astype(str).str.lower().str.contains(query) |
-                df["Article"].astype(str).str.lower().str.contains(query)
-            ]
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(r["ID"], r["Depot"], r["Telephone"], r["Article"],
-                                           f"{float(r['Price']):.2f}", r["Status"]))
-        for i in tree.get_children():
-            if tree.item(i)["values"][0] in selected_ids:
-                tree.selection_add(i)
-        update_image_preview()
-        buyer_win.after(2000, load_buyer_items)
+        if not refresh_paused["value"] and shown_version["value"] != _items_version:
+            refresh_buyer_items()
+        buyer_win.after(500, load_buyer_items)
+
+    search_var.trace_add("write", debounce(buyer_win, 250, refresh_buyer_items))
 
     def with_pause(func):
         def wrapper(*args, **kwargs):
@@ -832,22 +1352,8 @@ def buyer_function():
 
     def update_image_preview(event=None):
         sel = tree.selection()
-        if sel:
-            item_id = tree.item(sel[0])["values"][0]
-            df = read_items()
-            img_path = str(df.loc[df["ID"] == item_id, "Image"].values[0]) if len(df.loc[df["ID"] == item_id, "Image"]) else ""
-            if img_path and img_path.lower() != "nan" and os.path.exists(img_path):
-                img = Image.open(img_path)
-                img = img.resize((300, 300), Image.LANCZOS)
-                img_tk = ImageTk.PhotoImage(img)
-                img_label.config(image=img_tk, text="")
-                img_label.image = img_tk
-            else:
-                img_label.config(image="", text="No photo available")
-                img_label.image = None
-        else:
-            img_label.config(image="", text="No photo available")
-            img_label.image = None
+        img_path = tree.set(sel[0], "Image") if sel else ""
+        show_thumbnail(img_label, img_path)
 
     tree.bind("<<TreeviewSelect>>", update_image_preview)
 
@@ -863,18 +1369,14 @@ def buyer_function():
         if buyer_id is None:
             return
 
-        df = read_items()
-        items_rows = []
-        ids_to_update = []
-        for s in sel:
-            item = tree.item(s)["values"]
-            ids_to_update.append(item[0])
-            items_rows.append({"item_id": item[0], "article": item[3], "depot": item[1], "price": float(item[4])})
+        # Rows use the item ID as iid
+        ids_to_update = list(sel)
+        items_rows, total = receipt_lines(ids_to_update)
 
         # Persist receipt (role='buyer') before marking as sold
-        receipt_id, total = create_receipt(buyer_id, role="buyer", items_rows=items_rows)
-        df.loc[df["ID"].isin(ids_to_update), "Status"] = "Sold"
-        write_items(df)
+        receipt_id, total = create_receipt(buyer_id, role="buyer", items_rows=items_rows,
+                                           precomputed_total=total)
+        mark_items_sold(ids_to_update)
 
         # Show receipt with buyer ID and details
         rec = tk.Toplevel(buyer_win)
@@ -945,69 +1447,75 @@ def user_portal():
     hsb.pack(side="bottom", fill="x")
     tree.pack(fill="both", expand=True)
 
+    # This seller's rows, looked up once and shared by the table and My Report
+    # until an item write bumps _items_version
+    mine_rows = {"version": None, "df": None}
+
+    def my_items():
+        if mine_rows["version"] != _items_version:
+            mine_rows["version"] = _items_version
+            mine_rows["df"] = items_of_user(uid)
+        return mine_rows["df"]
+
     def load_my_items():
-        tree.delete(*tree.get_children())
-        df = read_items()
-        df = df[df["UserID"].astype(str) == uid]
+        # Rows keep the item ID as iid; only rows that changed are touched
         q = search_var.get().strip().lower()
-        if q:
-            df = df[df["Article"].astype(str).str.lower().str.contains(q)]
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(r["ID"], r["Article"], f"{float(r['Price']):.2f}", r["Status"]))
+        df = (items_of_user(uid, q) if q else my_items())[["ID", "Article", "Price", "Status"]]
+        df = df.assign(Price=df["Price"].map("{:.2f}".format))
+        sync_tree(tree, [(row[0], row) for row in df.itertuples(index=False, name=None)])
 
-    def my_report():
-        df = read_items()
-        mine = df[df["UserID"].astype(str) == uid]
-        sold = mine[mine["Status"] == "Sold"]
-        available = mine[mine["Status"] == "Available"]
-
-        total_items = len(mine)
-        sold_count = len(sold)
-        remaining_count = len(available)
-        total_sales_amount = float(sold["Price"].sum())
-        seller_income = total_sales_amount * 0.75  # 25% depot, 75% to seller
-
-        # Show report
+    # The report window is built on the first click, then hidden and re-filled
+    report = {"win": None}
+
+    def build_report_window():
         rep = tk.Toplevel(up)
         rep.title("My Report")
         rep.geometry("520x520")
         rep.configure(bg="#F7FFF1")
+        rep.protocol("WM_DELETE_WINDOW", rep.withdraw)
 
-        summary = (
-            f"User: {u['name'] or ''} ({uid})\n"
-            f"Phone: {u['phone'] or ''}\n"
-            f"Created: {u['created_at']}\n\n"
-            f"Total Items Listed: {total_items}\n"
-            f"Items Sold: {sold_count}\n"
-            f"Items Remaining: {remaining_count}\n"
-            f"Gross Sales: ${total_sales_amount:.2f}\n"
-            f"Estimated Income (75%): ${seller_income:.2f}\n"
-        )
         tk.Label(rep, text="My Inventory Report", font=("Arial", 18, "bold"), bg="#F7FFF1").pack(pady=10)
-        txt = tk.Text(rep, font=("Arial", 12), bg="#F7FFF1", wrap="word")
-        txt.pack(fill="both", expand=True, padx=10, pady=8)
-        txt.insert("1.0", summary + "\nSold Items:\n")
-        for _, r in sold.iterrows():
-            txt.insert("end", f"- {r['Article']} | ${float(r['Price']):.2f}\n")
-        txt.insert("end", "\nAvailable Items:\n")
-        for _, r in available.iterrows():
-            txt.insert("end", f"- {r['Article']} | ${float(r['Price']):.2f}\n")
-        txt.config(state="disabled")
+        rep.txt = tk.Text(rep, font=("Arial", 12), bg="#F7FFF1", wrap="word")
+        rep.txt.pack(fill="both", expand=True, padx=10, pady=8)
+        # Receipt history widgets are packed only while there is history to show
+        rep.hist_label = tk.Label(rep, text="\nMy Historical Receipts (as actor):", font=("Arial", 14, "bold"), bg="#F7FFF1")
+        rep.hist = tk.Text(rep, font=("Arial", 11), bg="#F7FFF1", height=10, wrap="word")
+        rep.btns = tk.Frame(rep, bg="#F7FFF1")
+        rep.btns.pack(pady=8)
+        tk.Button(rep.btns, text="Refresh", bg="#2E8B57", fg="white", command=lambda: my_report()).grid(row=0, column=0, padx=6)
+        tk.Button(rep.btns, text="Close", bg="#A9A9A9", fg="white", command=rep.withdraw).grid(row=0, column=1, padx=6)
+        return rep
 
-        # Historical receipts affecting this user (as buyer)
-        with db_conn() as con:
-            cur = con.cursor()
-            cur.execute("SELECT id FROM receipts WHERE user_id = ? ORDER BY created_at DESC", (uid,))
-            rows = cur.fetchall()
-        if rows:
-            tk.Label(rep, text="\nMy Historical Receipts (as actor):", font=("Arial", 14, "bold"), bg="#F7FFF1").pack()
-            hist = tk.Text(rep, font=("Arial", 11), bg="#F7FFF1", height=10, wrap="word")
-            hist.pack(fill="both", expand=False, padx=10, pady=6)
-            for (rid,) in rows:
-                hist.insert("end", render_receipt_text(rid) + "\n" + "-"*40 + "\n")
-            hist.config(state="disabled")
-
-        tk.Button(rep, text="Close", bg="#A9A9A9", fg="white", command=rep.destroy).pack(pady=8)
+    def my_report():
+        mine = my_items()
+        status = mine["Status"].values   # Categorical: compares codes, no Series built
+        sold = mine[status == "Sold"]
+        available = mine[status == "Available"]
+        summary = _user_report_summary(u, uid, mine)
+
+        if report["win"] is None or not report["win"].winfo_exists():
+            report["win"] = build_report_window()
+        rep = report["win"]
+        sold_lines = "".join(f"- {article} | ${float(price):.2f}\n"
+                             for article, price in sold[["Article", "Price"]].itertuples(index=False, name=None))
+        avail_lines = "".join(f"- {article} | ${float(price):.2f}\n"
+                              for article, price in available[["Article", "Price"]].itertuples(index=False, name=None))
+        # One insert for the whole report rather than one Tk call per line
+        set_text(rep.txt, summary + "\nSold Items:\n" + sold_lines + "\nAvailable Items:\n" + avail_lines)
+
+        rep.deiconify()
+        rep.lift()
+
+        # Historical receipts affecting this user (as buyer), loaded off the Tk thread
+        def show_history(history):
+            if history:
+                set_text(rep.hist, history)
+                rep.hist_label.pack(before=rep.btns)
+                rep.hist.pack(fill="both", expand=False, padx=10, pady=6, before=rep.btns)
+            else:
+                rep.hist_label.pack_forget()
+                rep.hist.pack_forget()
+        run_in_background(rep, receipt_history_text, show_history, uid)
 
     # Buttons
     btn = tk.Frame(up, bg="#EEF9F3")
@@ -1017,65 +1525,78 @@ def user_portal():
     tk.Button(btn, text="Close", width=16, height=2, bg="#A9A9A9", fg="white",
               font=("Arial", 12), command=up.destroy).grid(row=0, column=1, padx=8, pady=6)
 
-    search_var.trace_add("write", lambda *_: load_my_items())
+    search_var.trace_add("write", debounce(up, 150, load_my_items))
     load_my_items()
 
 # =========================================================
 # ============== Reports (by any User ID) =================
 # =========================================================
-def reports_by_user():
+def _user_report_summary(u, uid, mine):
     """
-    Prompt for any UserID and show their inventory + counts + income
+    Header + counts block shared by my_report and reports_by_user; mine is
+    the user's items (items_of_user). All figures come from one Status groupby.
     """
-    uid = get_user_dialog(window, title="Reports - Enter User ID")
-    if not uid:
-        return
-    u = get_user(uid)
-    df = read_items()
-    mine = df[df["UserID"].astype(str) == uid]
-    sold = mine[mine["Status"] == "Sold"]
-    available = mine[mine["Status"] == "Available"]
-
-    total_items = len(mine)
-    sold_count = len(sold)
-    remaining_count = len(available)
-    total_sales_amount = float(sold["Price"].sum())
-    seller_income = total_sales_amount * 0.75
-
-    rep = tk.Toplevel(window)
-    rep.title("User Report")
-    rep.geometry("560x560")
-    rep.configure(bg="#FAFFF6")
-
-    tk.Label(rep, text="User Report", font=("Arial", 22, "bold"), bg="#FAFFF6").pack(pady=10)
-    summary = (
+    agg = mine.groupby("Status", observed=True, sort=False)["Price"].agg(["sum", "count"])
+    sold_count = int(agg.at["Sold", "count"]) if "Sold" in agg.index else 0
+    remaining_count = int(agg.at["Available", "count"]) if "Available" in agg.index else 0
+    total_sales_amount = float(agg.at["Sold", "sum"]) if "Sold" in agg.index else 0.0
+    seller_income = total_sales_amount * 0.75  # 25% depot, 75% to seller
+    return (
         f"User: {(u and u.get('name')) or ''} ({uid})\n"
         f"Phone: {(u and u.get('phone')) or ''}\n"
         f"Created: {(u and u.get('created_at')) or ''}\n\n"
-        f"Total Items Listed: {total_items}\n"
+        f"Total Items Listed: {len(mine)}\n"
         f"Items Sold: {sold_count}\n"
         f"Items Remaining: {remaining_count}\n"
         f"Gross Sales: ${total_sales_amount:.2f}\n"
         f"Estimated Income (75%): ${seller_income:.2f}\n"
     )
-    txt = tk.Text(rep, font=("Arial", 12), bg="#FAFFF6", wrap="word")
-    txt.pack(fill="both", expand=True, padx=12, pady=10)
-    txt.insert("1.0", summary + "\nItems in Inventory:\n")
-    for _, r in mine.iterrows():
-        txt.insert("end", f"- [{r['Status']}] {r['Article']} | ${float(r['Price']):.2f}\n")
-    txt.insert("end", "\nHistorical Receipts (as actor):\n")
-    with db_conn() as con:
-        cur = con.cursor()
-        cur.execute("SELECT id FROM receipts WHERE user_id = ? ORDER BY created_at DESC", (uid,))
-        rows = cur.fetchall()
-    if rows:
-        for (rid,) in rows:
-            txt.insert("end", render_receipt_text(rid) + "\n" + "-"*40 + "\n")
-    else:
-        txt.insert("end", "None\n")
-    txt.config(state="disabled")
 
-    tk.Button(rep, text="Close", bg="#A9A9A9", fg="white", command=rep.destroy).pack(pady=8)
+# User report window, built on first use and then hidden/re-filled instead of rebuilt
+_user_report_win = None
+
+def _build_user_report_window():
+    rep = tk.Toplevel(window)
+    rep.title("User Report")
+    rep.geometry("560x560")
+    rep.configure(bg="#FAFFF6")
+    rep.protocol("WM_DELETE_WINDOW", rep.withdraw)
+
+    tk.Label(rep, text="User Report", font=("Arial", 22, "bold"), bg="#FAFFF6").pack(pady=10)
+    rep.txt = tk.Text(rep, font=("Arial", 12), bg="#FAFFF6", wrap="word")
+    rep.txt.pack(fill="both", expand=True, padx=12, pady=10)
+    tk.Button(rep, text="Close", bg="#A9A9A9", fg="white", command=rep.withdraw).pack(pady=8)
+    return rep
+
+def reports_by_user():
+    """
+    Prompt for any UserID and show their inventory + counts + income
+    """
+    global _user_report_win
+    uid = get_user_dialog(window, title="Reports - Enter User ID")
+    if not uid:
+        return
+    u = get_user(uid)
+    mine = items_of_user(uid)
+    summary = _user_report_summary(u, uid, mine)
+
+    if _user_report_win is None or not _user_report_win.winfo_exists():
+        _user_report_win = _build_user_report_window()
+    rep = _user_report_win
+    item_lines = "".join(f"- [{status}] {article} | ${float(price):.2f}\n"
+                         for status, article, price in mine[["Status", "Article", "Price"]].itertuples(index=False, name=None))
+    head = summary + "\nItems in Inventory:\n" + item_lines + "\nHistorical Receipts (as actor):\n"
+    # One insert for the whole report rather than one Tk call per line; the
+    # receipts are rendered off the Tk thread and filled in when ready
+    set_text(rep.txt, head + "Loading...\n")
+    rep.shown_uid = uid
+    rep.deiconify()
+    rep.lift()
+
+    def show_history(history):
+        if rep.shown_uid == uid:   # not since replaced by another user's report
+            set_text(rep.txt, head + (history or "None\n"))
+    run_in_background(rep, receipt_history_text, show_history, uid)
 
 # =========================================================
 # ================= Main Window + Menus ===================
@@ -1103,16 +1624,19 @@ menubar.add_cascade(label="Buyer", menu=m_buyer)
 
 m_help = tk.Menu(menubar, tearoff=0)
 m_help.add_command(label="About", command=lambda: messagebox.showinfo("About",
-    "Depot-Vente System with Users, Receipts, and Reports.\nData: items.csv + app.db"))
+    "Depot-Vente System with Users, Receipts, and Reports.\nData: app.db"))
 menubar.add_cascade(label="Help", menu=m_help)
 
 window.config(menu=menubar)
 
-tk.Label(window, text="Depot-Vente Management", font=("Arial", 28, "bold"), bg="#FFF0F5").pack(pady=40)
-
-# Quick-access buttons
-tk.Button(window, text="Owner Login", font=("Arial", 16), width=18, height=2, bg="#FF69B4", fg="white", command=owner_function).pack(pady=10)
-tk.Button(window, text="Buyer Access", font=("Arial", 16), width=18, height=2, bg="#1E90FF", fg="white", command=buyer_function).pack(pady=10)
-tk.Button(window, text="User Portal", font=("Arial", 16), width=18, height=2, bg="#7B68EE", fg="white", command=user_portal).pack(pady=10)
+# Title + quick-access buttons are gridded inside one frame, and the frame is
+# packed into the window once, so the window's layout is computed once
+home = tk.Frame(window, bg="#FFF0F5")
+tk.Label(home, text="Depot-Vente Management", font=("Arial", 28, "bold"), bg="#FFF0F5").grid(row=0, column=0, pady=40)
+tk.Button(home, text="Owner Login", font=("Arial", 16), width=18, height=2, bg="#FF69B4", fg="white", command=owner_function).grid(row=1, column=0, pady=10)
+tk.Button(home, text="Buyer Access", font=("Arial", 16), width=18, height=2, bg="#1E90FF", fg="white", command=buyer_function).grid(row=2, column=0, pady=10)
+tk.Button(home, text="User Portal", font=("Arial", 16), width=18, height=2, bg="#7B68EE", fg="white", command=user_portal).grid(row=3, column=0, pady=10)
+home.pack()
+window.update_idletasks()
 
 window.mainloop()
\ No newline at end of file